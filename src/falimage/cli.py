@@ -15,63 +15,315 @@
 #   ./falimage.py -m lora -p "a cat" --loras "my_lora:0.8,https://host/x.safetensors:1.2" -n cat
 #   ./falimage.py -m lora -f prompt.txt -i portrait_4_3 --dry-run
 #
-# Requires FAL_KEY in environment (see .env). Uses python-dotenv if present.
+# Requires FAL_KEY in environment (see .env, loaded when main() starts).
 
 from __future__ import annotations
 
-import itertools
-import mimetypes
+import functools
+import json
 import os
+import queue
+import threading
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from pprint import pformat
 from random import randint
-from typing import Iterable, List, Tuple, Optional
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Iterable, List, Tuple, Optional
 from urllib.parse import urlsplit, unquote
 
 import click
-import requests
 from dotenv import load_dotenv
 
 from .exif import set_exif_data
 from .registry import MODEL_REGISTRY
 
-load_dotenv()
+if TYPE_CHECKING:
+    # Imported lazily at runtime (see _get_session); only needed for annotations
+    import requests
 
 # Allowed named sizes (shared across models in this repository)
-ALLOWED_SIZES = {"square_hd", "square", "portrait_4_3", "portrait_16_9", "landscape_4_3", "landscape_16_9"}
+ALLOWED_SIZES = frozenset({"square_hd", "square", "portrait_4_3", "portrait_16_9", "landscape_4_3", "landscape_16_9"})
 
 # ------------------------------ Utilities ------------------------------
 
-CHUNK_SIZE = 1024 * 64  # 64 KiB
 
+@functools.lru_cache(maxsize=1)
+def _load_env() -> None:
+    """Load .env once per process; called from main() rather than at import."""
+    load_dotenv()
 
+
+# Shorthand prefixes for LoRA names and source images, read once per process
+_SAFETENSORS_URL = os.environ.get("SAFETENSORS_URL", "")
+_SOURCE_IMAGE_URL = os.environ.get("SOURCE_IMAGE_URL", "")
+
+
+def _refresh_env_prefixes() -> None:
+    """Re-read the prefixes; main() calls this after .env is loaded, tests after changing env."""
+    global _SAFETENSORS_URL, _SOURCE_IMAGE_URL
+    _SAFETENSORS_URL = os.environ.get("SAFETENSORS_URL", "")
+    _SOURCE_IMAGE_URL = os.environ.get("SOURCE_IMAGE_URL", "")
+
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+DOWNLOAD_TIMEOUT = (5.0, 60.0)  # (connect, read) seconds
+
+# Prompt files given by name (-f tintin) are looked up here
+PROMPTS_DIR = Path(__file__).resolve().parents[2] / "prompts"
+
+
+@functools.lru_cache(maxsize=64)
+def _load_prompt(path: str) -> Tuple[str, str]:
+    """Return (prompt text, file stem) for a prompt file, read once per path."""
+    p = Path(path)
+    return p.read_bytes().decode("utf-8").strip(), p.stem
+
+
+@functools.lru_cache(maxsize=1024)
 def _split_name_and_ext(filename: str) -> Tuple[str, str]:
-    p = Path(filename)
-    return p.stem, p.suffix  # suffix includes leading dot or empty string
+    # Same split as Path.stem/Path.suffix, without building a Path;
+    # suffix includes leading dot or is empty (also for ".hidden" and "name.")
+    head, dot, tail = filename.rpartition(".")
+    if not head or not tail:
+        return filename, ""
+    return head, dot + tail
+
+
+def _exclusive_create(path: Path) -> bool:
+    """Atomically create path as an empty file; False if it already exists."""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+    except FileExistsError:
+        return False
+    return True
 
 
-def _unique_path(base: Path) -> Path:
-    if not base.exists():
-        return base
-    stem, suffix = base.stem, base.suffix
-    for i in itertools.count(1):
+def _unique_path(base: Path, taken: Iterable[str] = frozenset()) -> Path:
+    """Return a free path based on base, created empty so nobody else can take it.
+
+    Tries base, then <stem>-1, <stem>-2, ... Names in taken are skipped without
+    touching the filesystem; every other probe is a single O_EXCL open, not an
+    exists() check plus a later open.
+    """
+    stem, suffix = _split_name_and_ext(base.name)
+    candidate, i = base, 1
+    while candidate.name in taken or not _exclusive_create(candidate):
         candidate = base.with_name(f"{stem}-{i}{suffix}")
-        if not candidate.exists():
-            return candidate
+        i += 1
+    return candidate
 
 
-def _ext_from_content_type(content_type: Optional[str]) -> str:
+class _UniqueNamer:
+    """Hand out unused file names in one directory without a stat() per probe.
+
+    The directory is listed once and names handed out are remembered, so names
+    known to be taken cost a set lookup instead of an exists() call. Naming and
+    creation go through _unique_path. Safe to share between threads.
+    """
+
+    def __init__(self, savedir: Path):
+        self.savedir = Path(savedir)
+        with os.scandir(self.savedir) as entries:
+            self._taken = {entry.name for entry in entries}
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str) -> Path:
+        """Claim a free name derived from name and create it as an empty file.
+
+        Creation uses O_EXCL, so a file that appeared after the directory was
+        listed (e.g. from another process) is never overwritten.
+        """
+        with self._lock:
+            path = _unique_path(self.savedir / name, self._taken)
+            self._taken.add(path.name)
+            return path
+
+
+# Image types fal.ai (and most CDNs) return, mapped to our preferred extension
+_IMAGE_EXT = MappingProxyType({
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+})
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    """Return the bare, lowercased media type of a Content-Type header ("" if missing)."""
     if not content_type:
         return ""
+    return _parse_media_type(content_type)
 
-    # Only trust image/*
-    if not content_type.lower().startswith("image/"):
-        return ""
 
-    # Try to map to a sensible extension
-    ext = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
-    return ext or ""
+@functools.lru_cache(maxsize=64)
+def _parse_media_type(content_type: str) -> str:
+    # CDNs repeat the exact same header string, so this is nearly always a cache hit
+    main, _, _ = content_type.partition(";")
+    return main.strip().lower()
+
+
+def _ext_from_content_type(content_type: Optional[str]) -> str:
+    # Only known image/* types map to an extension
+    return _IMAGE_EXT.get(_media_type(content_type), "")
+
+
+MAX_DOWNLOAD_WORKERS = 8
+DOWNLOAD_POOL_SIZE = 16  # keep-alive connections per host, >= MAX_DOWNLOAD_WORKERS
+EXIF_QUEUE_SIZE = 4  # downloaded files waiting for the EXIF writer
+
+
+def _exif_writer(exif_queue: queue.Queue) -> None:
+    """Consume saved files from exif_queue and tag them until a None sentinel arrives."""
+    while True:
+        filename = exif_queue.get()
+        if filename is None:
+            return
+
+        # Set EXIF metadata on the saved image (best-effort)
+        try:
+            set_exif_data(filename, quiet=False)
+        except Exception as e:
+            print(f"Warning: failed to set EXIF for {filename}: {e}")
+            pass
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """os.write until all of data is written (os.write may write less)."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _iter_body(resp) -> Iterable[bytes]:
+    """Yield the response body in DOWNLOAD_CHUNK_SIZE pieces.
+
+    Reads straight from the urllib3 stream (which undoes any transfer encoding)
+    and skips requests' iter_content layer; responses without a raw stream
+    fall back to iter_content.
+    """
+    raw = getattr(resp, "raw", None)
+    if raw is not None:
+        return raw.stream(DOWNLOAD_CHUNK_SIZE, decode_content=True)
+    return (chunk for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE, decode_unicode=False) if chunk)
+
+
+def _download_one(
+        session,
+        url: str,
+        idx: int,
+        name_prefix: Optional[str],
+        namer: _UniqueNamer,
+        timeout: Tuple[float, float],
+        exif_queue: queue.Queue,
+) -> Optional[Path]:
+    """Download a single image URL into namer's directory; returns the saved Path or None.
+
+    The finished file is handed to the EXIF writer via exif_queue.
+    """
+    # Lazy import: only downloads need the HTTP stack
+    import requests
+
+    try:
+        parsed = urlsplit(url)
+        # Keep only the final path component, decoded for nicer names
+        raw_name = Path(unquote(parsed.path)).name or "download"
+        stem, suffix = _split_name_and_ext(raw_name)
+
+        # Prepare request; the body is streamed, never buffered (no resp.content)
+        resp = session.get(url, stream=True, timeout=timeout)
+        try:
+            resp.raise_for_status()
+
+            # Parse the header once; it decides both the skip and the fallback suffix
+            ctype = _media_type(resp.headers.get("Content-Type"))
+            if not ctype.startswith("image/"):
+                # Skip before reading any of the body
+                print(f"Skip non-image content for {url} (Content-Type={ctype or 'unknown'})")
+                return None
+
+            # If no suffix in URL, infer from content type
+            suffix = suffix or _IMAGE_EXT.get(ctype, ".bin")
+
+            if name_prefix:
+                out_name = f"{name_prefix}-{idx}-{stem}{suffix}"
+            else:
+                out_name = f"{stem}{suffix}"
+
+            # Reserve (create) the name so neither sibling workers nor other processes can claim it
+            filename = namer.reserve(out_name)
+
+            # Stream to a .part file through a raw fd (no BufferedWriter copy),
+            # then atomically move it over the reserved name
+            tmp_path = None
+            try:
+                # The .part name is claimed with O_EXCL too, so a stale or foreign
+                # <name>.part is never truncated, nor deleted if we fail
+                tmp_path = _unique_path(filename.with_name(filename.name + ".part"))
+                fd = os.open(tmp_path, os.O_WRONLY)
+                try:
+                    for chunk in _iter_body(resp):
+                        _write_all(fd, chunk)
+                finally:
+                    os.close(fd)
+                os.replace(tmp_path, filename)
+            except BaseException:
+                if tmp_path is not None:
+                    tmp_path.unlink(missing_ok=True)
+                filename.unlink(missing_ok=True)
+                raise
+        finally:
+            # Skipped, failed or done: always release the connection back to the pool
+            resp.close()
+
+        print(f"Saved {filename}")
+        exif_queue.put(filename)
+        return filename
+
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to download {url}: {e}")
+    except OSError as e:
+        print(f"Filesystem error for {url}: {e}")
+    except Exception as e:
+        # Catch-all to keep batch going
+        print(f"Unexpected error for {url}: {e}")
+    return None
+
+
+_SESSION: Optional["requests.Session"] = None
+
+
+def _get_session() -> "requests.Session":
+    """Return the process-wide download session, creating it on first use.
+
+    A pooled, retrying adapter is mounted so connections to the CDN stay
+    alive across images and across save_all_images calls.
+    """
+    global _SESSION
+    if _SESSION is None:
+        # Lazy import: only downloads need the HTTP stack
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=DOWNLOAD_POOL_SIZE,
+            pool_maxsize=DOWNLOAD_POOL_SIZE,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "User-Agent": "image-downloader/1.0",
+            "Connection": "keep-alive",
+            # Images are already compressed; don't spend CPU on gzip
+            "Accept-Encoding": "identity",
+        })
+        _SESSION = session
+    return _SESSION
 
 
 def save_all_images(
@@ -79,7 +331,7 @@ def save_all_images(
         name_prefix: Optional[str] = None,
         savedir: Path | str = "assets",
         open_files: bool = False,
-        timeout: Tuple[float, float] = (5.0, 60.0),  # (connect, read)
+        timeout: Tuple[float, float] = DOWNLOAD_TIMEOUT,
 ) -> List[Path]:
     """
     Download images from URLs into savedir.
@@ -87,7 +339,15 @@ def save_all_images(
     If name_prefix is provided, filenames become:
       "<name_prefix>-<N>-<original_stem><ext>" where N starts at 1.
 
-    Returns a list of saved Paths.
+    Downloads run concurrently on up to MAX_DOWNLOAD_WORKERS threads sharing
+    the process-wide session from _get_session(); a separate writer thread
+    sets EXIF data on finished files while later downloads are still in
+    flight. Returns a list of saved Paths in the order of urls, once all of
+    them have been tagged.
+
+    Transport is HTTP/1.1 (requests): each concurrent worker gets its own
+    pooled keep-alive connection, so TLS handshakes overlap instead of adding
+    up, and wall-clock time tracks the slowest image rather than the sum.
 
     Security notes:
     - Validates Content-Type is image/* before saving.
@@ -97,66 +357,42 @@ def save_all_images(
     savedir = Path(savedir)
     savedir.mkdir(parents=True, exist_ok=True)
 
-    saved_paths: List[Path] = []
-
-    with requests.Session() as session:
-        session.headers.update({"User-Agent": "image-downloader/1.0"})
-        for idx, url in enumerate(urls, start=1):
-            try:
-                parsed = urlsplit(url)
-                # Keep only the final path component, decoded for nicer names
-                raw_name = Path(unquote(parsed.path)).name or "download"
-                stem, suffix = _split_name_and_ext(raw_name)
-
-                # Prepare request
-                resp = session.get(url, stream=True, timeout=timeout)
-                resp.raise_for_status()
-
-                ctype = resp.headers.get("Content-Type", "")
-                if not ctype.lower().startswith("image/"):
-                    print(f"Skip non-image content for {url} (Content-Type={ctype or 'unknown'})")
-                    resp.close()
-                    continue
-
-                # If no suffix in URL, infer from content type
-                if not suffix:
-                    inferred = _ext_from_content_type(ctype)
-                    suffix = inferred or ".bin"
-
-                if name_prefix:
-                    out_name = f"{name_prefix}-{idx}-{stem}{suffix}"
-                else:
-                    out_name = f"{stem}{suffix}"
-
-                filename = _unique_path(savedir / out_name)
-
-                # Stream to disk
-                with open(filename, "wb") as f:
-                    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
-                        if chunk:  # filter out keep-alive chunks
-                            f.write(chunk)
-
-                # Set EXIF metadata on the saved image (best-effort)
-                try:
-                    set_exif_data(filename, quiet=False)
-                except Exception as e:
-                    print(f"Warning: failed to set EXIF for {filename}: {e}")
-                    pass
-
-                saved_paths.append(filename)
-                print(f"Saved {filename}")
-
-                if open_files:
-                    # Uses default handler on macOS/Linux/Windows
-                    webbrowser.open(filename.resolve().as_uri())
-
-            except requests.exceptions.RequestException as e:
-                print(f"Failed to download {url}: {e}")
-            except OSError as e:
-                print(f"Filesystem error for {url}: {e}")
-            except Exception as e:
-                # Catch-all to keep batch going
-                print(f"Unexpected error for {url}: {e}")
+    urls = list(urls)
+    if not urls:
+        return []
+
+    results: dict[int, Path] = {}
+    namer = _UniqueNamer(savedir)
+
+    # EXIF tagging runs on its own thread so it overlaps with the remaining downloads
+    exif_queue: queue.Queue = queue.Queue(maxsize=EXIF_QUEUE_SIZE)
+    writer = threading.Thread(target=_exif_writer, args=(exif_queue,), name="exif-writer", daemon=True)
+    writer.start()
+
+    try:
+        session = _get_session()
+        with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(urls))) as pool:
+            futures = {
+                pool.submit(_download_one, session, url, idx, name_prefix, namer, timeout, exif_queue): idx
+                for idx, url in enumerate(urls, start=1)
+            }
+            for future in as_completed(futures):
+                path = future.result()
+                if path is not None:
+                    results[futures[future]] = path
+    finally:
+        # Let the writer drain what is queued, then stop
+        exif_queue.put(None)
+        writer.join()
+
+    saved_paths = [results[idx] for idx in sorted(results)]
+
+    if open_files and saved_paths:
+        # Open once at the end rather than per file; uses default handler on macOS/Linux/Windows
+        uris = [path.resolve().as_uri() for path in saved_paths]
+        webbrowser.open(uris[0])
+        for uri in uris[1:]:
+            webbrowser.open_new_tab(uri)
 
     return saved_paths
 
@@ -166,97 +402,119 @@ def parse_loras(loras: str):
 
     Accepts JSON list/dict or comma-separated tokens "name[:scale]" or URL[:scale].
     Shorthand names (no slash) are expanded to SAFETENSORS_URL
+
+    Parsing is cached per (input, SAFETENSORS_URL); every call returns fresh dicts.
     """
-    import json
-    normalized = loras or ""
-    result = []
-    if not normalized:
-        return result
-
-    pref = os.getenv("SAFETENSORS_URL")
-    suff = ".safetensors"
-
-    def to_url(token: str) -> str:
-        # Treat anything with "://" as a full URL to leave untouched
-        return token if "://" in token or "/" in token else f"{pref}{token}{suff}"
-
-    def split_path_scale(token: str) -> tuple[str, Optional[float]]:
-        t = token.strip()
-        if not t:
-            return "", None
-        if "://" in t:
-            # URL: only treat a colon after the last slash as scale separator
-            last_slash = t.rfind('/')
-            last_colon = t.rfind(':')
-            if last_colon > last_slash:
-                path = t[:last_colon]
-                try:
-                    scale = float(t[last_colon + 1:].strip())
-                except ValueError:
-                    scale = 1.0
-                return path, scale
-            return t, None
+    return [dict(item) for item in _parse_loras(loras or "", _SAFETENSORS_URL)]
+
+
+_LORA_SUFFIX = ".safetensors"
+
+
+def _lora_url(token: str, pref: Optional[str]) -> str:
+    # Treat anything with "://" or a slash as a full URL/path to leave untouched
+    return token if "://" in token or "/" in token else f"{pref}{token}{_LORA_SUFFIX}"
+
+
+def _lora_item(token: str, pref: Optional[str]) -> Optional[dict]:
+    """Parse one "name[:scale]" or "URL[:scale]" token; None for empty tokens."""
+    t = token.strip()
+    if not t:
+        return None
+    colon = t.rfind(':')
+    if "://" in t:
+        # URL: only treat a colon after the last slash as scale separator
+        if colon > t.rfind('/'):
+            path, scale_str = t[:colon], t[colon + 1:]
+        else:
+            path, scale_str = t, None
+    elif colon >= 0:
         # Non-URL: split on the last colon
-        if ':' in t:
-            path, scale_str = t.rsplit(':', 1)
-            try:
-                return path.strip(), float(scale_str.strip())
-            except ValueError:
-                return path.strip(), 1.0
-        return t, None
+        path, scale_str = t[:colon].strip(), t[colon + 1:]
+    else:
+        path, scale_str = t, None
+    if not path:
+        return None
+    scale = 1.0
+    if scale_str is not None:
+        try:
+            scale = float(scale_str.strip())
+        except ValueError:
+            pass
+    return {"path": _lora_url(path, pref), "scale": scale}
 
-    def to_item(token: str):
-        token = token.strip()
-        if not token:
-            return None
-        path_part, scale_val = split_path_scale(token)
-        if not path_part:
-            return None
-        return {"path": to_url(path_part), "scale": (scale_val if scale_val is not None else 1.0)}
+
+def _lora_items_from_csv(text: str, pref: Optional[str]) -> list[dict]:
+    items = (_lora_item(raw, pref) for raw in text.split(','))
+    return [item for item in items if item]
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_loras(normalized: str, pref: Optional[str]) -> tuple[dict, ...]:
+    if not normalized:
+        return ()
 
     first = normalized.lstrip()
-    if first.startswith('[') or first.startswith('{'):
-        try:
-            parsed = json.loads(normalized)
-            if isinstance(parsed, dict):
-                parsed = [parsed]
-            if isinstance(parsed, list):
-                for it in parsed:
-                    if isinstance(it, str):
-                        item = to_item(it)
-                        if item:
-                            result.append(item)
-                    elif isinstance(it, dict):
-                        path = it.get('path') or it.get('url') or it.get('name')
-                        scale = it.get('scale', 1.0)
-                        if path:
-                            result.append({"path": to_url(str(path)), "scale": float(scale)})
-        except Exception:
-            parts = [p.strip() for p in normalized.split(',') if p.strip()]
-            result = [to_item(p) for p in parts if to_item(p)]
-    else:
-        parts = [p.strip() for p in normalized.split(',') if p.strip()]
-        result = [to_item(p) for p in parts if to_item(p)]
+    if first[:1] not in ("[", "{"):
+        # Fast path for the common "name[:scale],..." form: no JSON attempt
+        return tuple(_lora_items_from_csv(normalized, pref))
 
-    return result
+    # JSON list/dict; malformed JSON falls back to comma splitting
+    result = []
+    try:
+        parsed = json.loads(normalized)
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+        if isinstance(parsed, list):
+            for it in parsed:
+                if isinstance(it, str):
+                    item = _lora_item(it, pref)
+                    if item:
+                        result.append(item)
+                elif isinstance(it, dict):
+                    path = it.get('path') or it.get('url') or it.get('name')
+                    scale = it.get('scale', 1.0)
+                    if path:
+                        result.append({"path": _lora_url(str(path), pref), "scale": float(scale)})
+    except Exception:
+        result = _lora_items_from_csv(normalized, pref)
+
+    return tuple(result)
+
+
+# Result keys that may carry image URLs, in order of preference
+_URL_KEYS = ("images", "output", "image")
+
+
+def _coerce_url(item) -> Optional[str]:
+    """A URL string as-is, a {"url": ...} dict's URL, anything else None."""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return item.get('url')
+    return None
 
 
 def extract_urls(result):
-    """Extract a list of image URLs from various result shapes."""
-    urls = []
-    if isinstance(result, dict):
-        if 'images' in result and isinstance(result['images'], list):
-            urls = [img.get('url') if isinstance(img, dict) else img for img in result['images']]
-        elif 'output' in result and isinstance(result['output'], list):
-            urls = [item.get('url') if isinstance(item, dict) else item for item in result['output']]
-        elif 'image' in result:
-            val = result['image']
-            if isinstance(val, list):
-                urls = [v.get('url') if isinstance(v, dict) else v for v in val]
-            else:
-                urls = [val.get('url') if isinstance(val, dict) else val]
-    return urls
+    """Extract a list of image URLs from various result shapes.
+
+    The first of _URL_KEYS present in result wins; its value may be a single
+    item or a list, each item a URL string or a {"url": ...} dict. Items
+    without a usable URL are dropped.
+    """
+    if not isinstance(result, dict):
+        return []
+    for key in _URL_KEYS:
+        val = result.get(key)
+        if val is None:
+            continue
+        seq = val if isinstance(val, list) else (val,)
+        return [url for url in map(_coerce_url, seq) if url]
+    return []
+
 
+# Appended to shorthand --image-urls names that have no extension
+DEFAULT_IMAGE_EXT = ".jpg"
 
 
 def parse_image_urls(image_urls: str) -> list[str]:
@@ -266,25 +524,26 @@ def parse_image_urls(image_urls: str) -> list[str]:
     - Split on commas, trim whitespace, ignore empty parts.
     - If the token contains "://", treat it as a full URL and keep it as-is.
     - Otherwise, treat it as a shorthand name and expand to
-      <SOURCE_IMAGE_URL>/<name>", appending ".jpg" if the
+      <SOURCE_IMAGE_URL>/<name>", appending DEFAULT_IMAGE_EXT (".jpg") if the
       name has no extension (no dot in the last path segment).
     """
-    pref = os.getenv("SOURCE_IMAGE_URL")
+    pref = _SOURCE_IMAGE_URL
     out: list[str] = []
+    append = out.append
     for raw in (image_urls or "").split(','):
         token = raw.strip()
         if not token:
             continue
         if "://" in token:
-            out.append(token)
+            append(token)
+        elif '.' in token.rpartition('/')[2]:
+            # last segment already has an extension
+            append(f"{pref}{token}")
         else:
-            # detect extension in last segment
-            name = token
-            if '.' not in name.split('/')[-1]:
-                name = f"{name}.jpg"
-            out.append(f"{pref}{name}")
+            append(f"{pref}{token}{DEFAULT_IMAGE_EXT}")
     return out
 
+
 def coerce_image_size(image_size, width, height):
     """Return the payload value for image_size, validating inputs.
 
@@ -308,13 +567,20 @@ def coerce_image_size(image_size, width, height):
         return None
 
     if isinstance(image_size, str):
-        if image_size not in ALLOWED_SIZES:
-            raise click.UsageError(f"Invalid --image-size. Allowed: {sorted(ALLOWED_SIZES)}")
-        return image_size
+        return _coerce_named_size(image_size)
 
     return image_size
 
 
+@functools.lru_cache(maxsize=64)
+def _coerce_named_size(name):
+    # Named sizes repeat across batch runs; width/height stays uncached so
+    # every caller gets its own dict.
+    if name not in ALLOWED_SIZES:
+        raise click.UsageError(f"Invalid --image-size. Allowed: {sorted(ALLOWED_SIZES)}")
+    return name
+
+
 def build_arguments(model_key, values):
     """Filter and assemble arguments according to model registry and user-provided values.
 
@@ -322,15 +588,10 @@ def build_arguments(model_key, values):
     """
     model = MODEL_REGISTRY[model_key]
     allowed = model["allowed"]
-    args = {}
 
-    # Start with defaults
-    args.update(model.get("defaults", {}))
-
-    # Then fill from values if present
-    for key, val in values.items():
-        if key in allowed and val is not None:
-            args[key] = val
+    # Start with defaults, then fill from values if present
+    args = {**model.get("defaults", {}),
+            **{key: values[key] for key in allowed.intersection(values) if values[key] is not None}}
 
     # Special: seed == 0 means randomize across all models for convenience
     if "seed" in allowed and (args.get("seed") is None or int(args.get("seed", 0)) == 0):
@@ -394,20 +655,21 @@ def send_request(model_key, arguments, dry_run=False):
 def main(model, prompt, promptfile, num_images, name, loras, image_size, width, height, seed,
          num_inference_steps, guidance_scale, strength, output_format, enable_safety_checker, image_urls, dry_run):
     """Unified image generation tool for multiple fal.ai models and a LoRA workflow."""
+    _load_env()
+    _refresh_env_prefixes()
+
     # Prompt handling
     prompt_prefix = None
     if promptfile:
-        prompts_dir = Path(__file__).resolve().parents[2] / "prompts"
         candidate = str(promptfile)
         if not candidate.endswith(".txt"):
             candidate = f"{candidate}.txt"
         prompt_path = Path(candidate)
         if not prompt_path.is_absolute():
-            prompt_path = prompts_dir / prompt_path.name
+            prompt_path = PROMPTS_DIR / prompt_path.name
         if not prompt_path.exists():
             raise click.UsageError(f"Prompt file not found: {prompt_path}")
-        prompt = prompt_path.read_text(encoding="utf-8").strip()
-        prompt_prefix = prompt_path.stem
+        prompt, prompt_prefix = _load_prompt(str(prompt_path))
     if not prompt:
         raise click.UsageError('Either --prompt or --promptfile must be provided.')
 
@@ -436,13 +698,13 @@ def main(model, prompt, promptfile, num_images, name, loras, image_size, width,
         "image_urls": image_urls_list,
     }
 
-    arguments = build_arguments(model, provided_values)
+    provided_keys = {k for k, v in provided_values.items() if v is not None}
+    arguments = build_arguments(model, {k: provided_values[k] for k in provided_keys})
 
     # Warn about ignored options (user provided but not allowed for this model)
-    allowed = MODEL_REGISTRY[model]["allowed"]
-    ignored = {k: v for k, v in provided_values.items() if v is not None and k not in allowed}
+    ignored = provided_keys - MODEL_REGISTRY[model]["allowed"]
     if ignored:
-        click.echo(f"Note: Ignoring unsupported options for model '{model}': {sorted(ignored.keys())}")
+        click.echo(f"Note: Ignoring unsupported options for model '{model}': {sorted(ignored)}")
 
     # Send
     result = send_request(model, arguments, dry_run=dry_run)
@@ -1,11 +1,11 @@
+import functools
+import itertools
 import os
 import random
+import struct
 from datetime import datetime
 from pathlib import Path
 
-import piexif
-from PIL import Image
-
 # Constants for EXIF settings
 DEFAULT_CAMERA_MAKE = "Apple"
 DEFAULT_CAMERA_MODEL = "iPhone 16 pro"
@@ -16,20 +16,196 @@ ORIENTATION = "Horizontal (normal)"
 EXPOSURE_PROGRAM = "Aperture-priority AE"
 FLASH_MODE = "Off, Did not fire"
 
+# Encoded once; these bytes are identical for every image
+_MAKE_B = DEFAULT_CAMERA_MAKE.encode()
+_MODEL_B = DEFAULT_CAMERA_MODEL.encode()
+_ARTIST_B = AUTHOR.encode()
+_SOFTWARE_B = SOFTWARE.encode()
+
 # Realistic ranges for camera settings
 EXPOSURE_TIMES = ["1/80", "1/60", "1/125", "1/250", "1/500"]
 ISO_VALUES = [100, 125, 200, 400, 800]
 APERTURE_VALUES = [1.8, 2.0, 2.8, 4.0, 5.6]
 FOCAL_LENGTHS = [35, 50, 85, 100, 135]  # Common portrait focal lengths
 
+# The same settings as EXIF rationals, built once at import
+EXPOSURE_TIME_RATIONALS = [tuple(map(int, s.split('/'))) for s in EXPOSURE_TIMES]
+FNUMBER_RATIONALS = [(int(a * 10), 10) for a in APERTURE_VALUES]
+FOCAL_LENGTH_RATIONALS = [(int(f), 1) for f in FOCAL_LENGTHS]
+
+# Every (ExposureTime, ISO, FNumber, FocalLength) combination, so one draw picks all four
+CAMERA_SETTINGS = tuple(itertools.product(EXPOSURE_TIME_RATIONALS, ISO_VALUES, FNUMBER_RATIONALS,
+                                          FOCAL_LENGTH_RATIONALS))
+
+# EXIF ASCII date/time layout
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+# TIFF field types used when locating tags in a dumped EXIF blob
+_ASCII, _SHORT, _RATIONAL = 2, 3, 5
+
+# Files with these suffixes get their EXIF segment patched without re-encoding
+JPEG_SUFFIXES = {".jpg", ".jpeg"}
+JPEG_SOI = b"\xff\xd8"
+
+# How much of the file head to scan for an existing APP1 (EXIF) segment
+EXIF_PROBE_SIZE = 64 * 1024
+APP1_MARKER = b"\xff\xe1"
+
+
+def has_own_exif(image_path) -> bool:
+    """Return True if the file already carries an APP1 segment written by us.
+
+    Only the first EXIF_PROBE_SIZE bytes are read; the APP1 segment must
+    contain both our SOFTWARE and AUTHOR strings.
+    """
+    try:
+        with open(image_path, "rb") as f:
+            head = f.read(EXIF_PROBE_SIZE)
+    except OSError:
+        return False
+    return _has_own_exif_segment(head)
+
+
+def _has_own_exif_segment(data: bytes) -> bool:
+    """has_own_exif for file contents already in memory (only the head is searched)."""
+    start = data.find(APP1_MARKER, 0, EXIF_PROBE_SIZE)
+    if start < 0:
+        return False
+    length = int.from_bytes(data[start + 2:start + 4], "big")
+    segment = data[start:start + 2 + length]
+    return _SOFTWARE_B in segment and _ARTIST_B in segment
+
+
+@functools.lru_cache(maxsize=8)
+def _copyright_for_year(year: int) -> bytes:
+    return COPYRIGHT_TEMPLATE.format(year=year, AUTHOR=AUTHOR).encode()
+
+
+def _exif_dict(file_time: datetime, exposure_time: tuple, iso: int, fnumber: tuple,
+               focal_length: tuple) -> dict:
+    """Build the full EXIF dict for one image, ready for piexif.dump."""
+    # Lazy import: piexif is only needed once we actually write EXIF
+    import piexif
+
+    formatted_date = file_time.strftime(EXIF_DATE_FORMAT).encode()
+    return {
+        # Primary image attributes
+        "0th": {
+            piexif.ImageIFD.Make: _MAKE_B,
+            piexif.ImageIFD.Model: _MODEL_B,
+            piexif.ImageIFD.Artist: _ARTIST_B,
+            piexif.ImageIFD.Software: _SOFTWARE_B,
+            # Copyright carries the year, so it is per image
+            piexif.ImageIFD.Copyright: _copyright_for_year(file_time.year),
+            piexif.ImageIFD.Orientation: 1,  # Horizontal (normal)
+        },
+        # Camera settings and time metadata
+        "Exif": {
+            # Note: EXIF ExposureProgram expects a SHORT code; keep a realistic one (3 = Aperture priority)
+            piexif.ExifIFD.ExposureProgram: 3,
+            # Flash tag: 0 = Flash did not fire
+            piexif.ExifIFD.Flash: 0,
+            piexif.ExifIFD.DateTimeOriginal: formatted_date,
+            piexif.ExifIFD.DateTimeDigitized: formatted_date,
+            piexif.ExifIFD.ExposureTime: exposure_time,
+            piexif.ExifIFD.ISOSpeedRatings: iso,
+            piexif.ExifIFD.FNumber: fnumber,
+            piexif.ExifIFD.FocalLength: focal_length,
+        },
+        "GPS": {},  # GPS info, if needed
+        "Interop": {},  # Interoperability settings
+        "1st": {},  # Thumbnail image data
+        "thumbnail": None,  # No thumbnail in this case
+    }
+
+
+def _ifd_value_pos(blob: bytes, tag: int, typ: int, count: int) -> int:
+    """Return the position of the value field of the one IFD entry (tag, typ, count) in blob."""
+    entry = struct.pack(">HHL", tag, typ, count)
+    pos = blob.find(entry)
+    if pos < 0 or blob.find(entry, pos + 1) >= 0:
+        raise ValueError(f"EXIF tag {tag:#06x} not found exactly once")
+    return pos + len(entry)
+
+
+@functools.lru_cache(maxsize=1)
+def _exif_blob_template() -> tuple[bytes, dict]:
+    """Dump our EXIF layout once and locate the bytes that change per image.
+
+    Returns (blob, slots): blob is a complete piexif.dump() result for sample
+    values, slots maps each per-image field to its byte position(s) in blob.
+    Only values of the same encoded size may be patched in, hence 4-digit years.
+    """
+    import piexif
+
+    sample_time = datetime(2000, 1, 1)
+    sample = _exif_dict(sample_time, EXPOSURE_TIME_RATIONALS[0], ISO_VALUES[0],
+                        FNUMBER_RATIONALS[0], FOCAL_LENGTH_RATIONALS[0])
+    blob = piexif.dump(sample)
+
+    # piexif writes big-endian TIFF right after the "Exif\0\0" header; IFD offsets are relative to it
+    tiff = len(b"Exif\x00\x00")
+    if blob[tiff:tiff + 2] != b"MM":
+        raise ValueError("unexpected EXIF byte order")
+
+    def data_pos(tag: int, typ: int, count: int) -> int:
+        # Values longer than 4 bytes live at an offset stored in the entry
+        return tiff + struct.unpack_from(">L", blob, _ifd_value_pos(blob, tag, typ, count))[0]
+
+    date_count = len(sample_time.strftime(EXIF_DATE_FORMAT)) + 1  # ASCII includes the NUL
+    copyright_b = sample["0th"][piexif.ImageIFD.Copyright]
+    copyright_pos = data_pos(piexif.ImageIFD.Copyright, _ASCII, len(copyright_b) + 1)
+    # Where {year} lands in the copyright string (same length for every 4-digit year)
+    marked = COPYRIGHT_TEMPLATE.format(year="\0" * 4, AUTHOR=AUTHOR).encode()
+    year_offsets = []
+    i = marked.find(b"\0" * 4)
+    while i >= 0:
+        year_offsets.append(i)
+        i = marked.find(b"\0" * 4, i + 4)
+
+    slots = {
+        "date": (data_pos(piexif.ExifIFD.DateTimeOriginal, _ASCII, date_count),
+                 data_pos(piexif.ExifIFD.DateTimeDigitized, _ASCII, date_count)),
+        "year": tuple(copyright_pos + i for i in year_offsets),
+        "exposure_time": data_pos(piexif.ExifIFD.ExposureTime, _RATIONAL, 1),
+        "iso": _ifd_value_pos(blob, piexif.ExifIFD.ISOSpeedRatings, _SHORT, 1),
+        "fnumber": data_pos(piexif.ExifIFD.FNumber, _RATIONAL, 1),
+        "focal_length": data_pos(piexif.ExifIFD.FocalLength, _RATIONAL, 1),
+    }
+    return blob, slots
+
+
+def _exif_bytes(file_time: datetime, exposure_time: tuple, iso: int, fnumber: tuple,
+                focal_length: tuple) -> bytes:
+    """Same bytes as piexif.dump(_exif_dict(...)) for 4-digit years, without running dump."""
+    blob, slots = _exif_blob_template()
+    buf = bytearray(blob)
+
+    date = file_time.strftime(EXIF_DATE_FORMAT).encode()
+    for pos in slots["date"]:
+        buf[pos:pos + len(date)] = date
+    year = b"%04d" % file_time.year
+    for pos in slots["year"]:
+        buf[pos:pos + len(year)] = year
+
+    struct.pack_into(">LL", buf, slots["exposure_time"], *exposure_time)
+    struct.pack_into(">H", buf, slots["iso"], iso)
+    struct.pack_into(">LL", buf, slots["fnumber"], *fnumber)
+    struct.pack_into(">LL", buf, slots["focal_length"], *focal_length)
+    return bytes(buf)
+
 
 def set_exif_data(image_path, *, rng: random.Random | None = None, file_time: datetime | None = None,
                   quiet: bool = True) -> bool:
     """Set fresh EXIF metadata for a given image file.
 
-    Opens an image file, initializes a fresh EXIF dictionary with various metadata
-    fields, populates realistic camera settings and date information, and writes
-    the EXIF data back to the image file.
+    Builds fresh EXIF metadata with realistic camera settings and date
+    information, and writes it into the image file. JPEG files are patched in
+    place with piexif.insert (no re-encode); other formats are rewritten
+    through PIL.
+
+    Files that already carry our EXIF segment (see has_own_exif) are left
+    untouched, so re-runs and re-downloads skip the write entirely.
 
     To make this function testable and deterministic, callers may provide
     a random number generator (rng) and a fixed file_time.
@@ -42,8 +218,12 @@ def set_exif_data(image_path, *, rng: random.Random | None = None, file_time: da
         quiet: If True, suppresses print messages. If False, prints status.
 
     Returns:
-        bool: True on success, False on failure (including missing file).
+        bool: True on success or if already tagged, False on failure (including
+        missing file).
     """
+    # Lazy import here so importing this module (e.g. for --help/--dry-run) stays cheap
+    import piexif
+
     # Coerce to Path
     p = Path(image_path)
 
@@ -53,66 +233,53 @@ def set_exif_data(image_path, *, rng: random.Random | None = None, file_time: da
             print(f"File not found: {p}")
         return False
 
-    try:
-        # Open the image file
-        img = Image.open(p)
-    except Exception as e:
-        if not quiet:
-            print(f"Can't open image {p}: {e}")
-        return False
+    # JPEGs are read once: the same bytes serve the already-tagged check and the insert
+    is_jpeg = p.suffix.lower() in JPEG_SUFFIXES
+    if is_jpeg:
+        try:
+            data = p.read_bytes()
+        except OSError as e:
+            if not quiet:
+                print(f"Can't read image {p}: {e}")
+            return False
+        already_tagged = _has_own_exif_segment(data)
+    else:
+        already_tagged = has_own_exif(p)
 
-    # Initialize a fresh EXIF dictionary with various sections
-    exif_dict = {
-        "0th": {},  # Primary image attributes
-        "Exif": {},  # Camera settings and time metadata
-        "GPS": {},  # GPS info, if needed
-        "Interop": {},  # Interoperability settings
-        "1st": {},  # Thumbnail image data
-        "thumbnail": None,  # No thumbnail in this case
-    }
+    # Nothing to do if a previous run already tagged this file
+    if already_tagged:
+        if not quiet:
+            print(f"EXIF data already present for {p}")
+        return True
 
     # Determine timestamp
     if file_time is None:
         file_time = datetime.fromtimestamp(os.path.getmtime(p))
-    formatted_date = file_time.strftime("%Y:%m:%d %H:%M:%S")
-    year = file_time.year
-
-    # Populate the primary image attributes section
-    exif_dict["0th"][piexif.ImageIFD.Make] = DEFAULT_CAMERA_MAKE.encode()
-    exif_dict["0th"][piexif.ImageIFD.Model] = DEFAULT_CAMERA_MODEL.encode()
-    exif_dict["0th"][piexif.ImageIFD.Artist] = AUTHOR.encode()
-    exif_dict["0th"][piexif.ImageIFD.Software] = SOFTWARE.encode()
-    exif_dict["0th"][piexif.ImageIFD.Copyright] = COPYRIGHT_TEMPLATE.format(year=year,AUTHOR=AUTHOR).encode()
-    exif_dict["0th"][piexif.ImageIFD.Orientation] = 1  # Horizontal (normal)
-
-    # Populate the date fields in the EXIF section
-    exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal] = formatted_date.encode()
-    exif_dict["Exif"][piexif.ExifIFD.DateTimeDigitized] = formatted_date.encode()
-
-    # Randomly select realistic camera settings
-    r = rng or random
-    exposure_time = r.choice(EXPOSURE_TIMES)
-    iso_value = r.choice(ISO_VALUES)
-    aperture_value = r.choice(APERTURE_VALUES)
-    focal_length = r.choice(FOCAL_LENGTHS)
-
-    # Convert exposure time to a rational value
-    numerator, denominator = map(int, exposure_time.split('/'))
-    exif_dict["Exif"][piexif.ExifIFD.ExposureTime] = (numerator, denominator)
-
-    # Populate the camera settings in the EXIF section
-    exif_dict["Exif"][piexif.ExifIFD.ISOSpeedRatings] = int(iso_value)
-    exif_dict["Exif"][piexif.ExifIFD.FNumber] = (int(aperture_value * 10), 10)  # Rational value
-    exif_dict["Exif"][piexif.ExifIFD.FocalLength] = (int(focal_length), 1)  # Rational value
-    # Note: EXIF ExposureProgram expects a SHORT code; keep a realistic one (3 = Aperture priority)
-    exif_dict["Exif"][piexif.ExifIFD.ExposureProgram] = 3
-    # Flash tag: 0 = Flash did not fire
-    exif_dict["Exif"][piexif.ExifIFD.Flash] = 0
+
+    # Randomly select realistic camera settings (already in EXIF rational form)
+    settings = (rng or random).choice(CAMERA_SETTINGS)
 
     try:
-        # Convert the EXIF dictionary to bytes and save it to the image file
-        exif_bytes = piexif.dump(exif_dict)
-        img.save(p, exif=exif_bytes)
+        # Convert the EXIF data to bytes and save it to the image file.
+        # The precomputed blob only fits 4-digit years; others go through dump.
+        if 1000 <= file_time.year <= 9999:
+            exif_bytes = _exif_bytes(file_time, *settings)
+        else:
+            exif_bytes = piexif.dump(_exif_dict(file_time, *settings))
+        if is_jpeg:
+            # Splice the APP1 segment into the bytes read above and write them back;
+            # no pixel decode/re-encode and no second read of the file
+            if not data.startswith(JPEG_SOI):
+                # piexif would treat non-JPEG bytes as a file name
+                raise ValueError("not a JPEG file")
+            piexif.insert(exif_bytes, data, str(p))
+        else:
+            # piexif.insert only handles JPEG; other formats go through PIL
+            from PIL import Image
+
+            with Image.open(p) as img:
+                img.load()
+            img.save(p, exif=exif_bytes)
         if not quiet:
             print(f"Updated EXIF data for {p}")
         return True
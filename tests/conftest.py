@@ -1,6 +1,7 @@
 import sys
 from pathlib import Path
 
+import pytest
 from dotenv import load_dotenv
 
 # Ensure src/ is on sys.path for importing falimage package during tests
@@ -11,3 +12,15 @@ if str(src_path) not in sys.path:
 
 # Load environment variables from project .env for tests
 load_dotenv(repo_root / ".env")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_piexif(tmp_path_factory):
+    """Import piexif/PIL and run one load up front so their one-time setup
+    is not billed to whichever EXIF test happens to run first."""
+    import piexif
+    from PIL import Image
+
+    p = tmp_path_factory.mktemp("warm") / "w.jpg"
+    Image.new("RGB", (1, 1), (0, 0, 0)).save(p, "JPEG")
+    piexif.load(str(p))
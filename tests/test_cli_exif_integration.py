@@ -15,7 +15,7 @@ class FakeResp:
     def raise_for_status(self):
         return None
 
-    def iter_content(self, chunk_size=8192):
+    def iter_content(self, chunk_size=8192, decode_unicode=False):
         yield self._content
 
     def close(self):
@@ -48,7 +48,7 @@ def test_save_all_images_sets_exif(monkeypatch, tmp_path: Path):
     # prepare one JPEG response
     content = _jpeg_bytes()
     mapping = {"https://ex/pic": FakeResp(content, ctype="image/jpeg")}
-    monkeypatch.setattr(cli.requests, "Session", lambda: FakeSession(mapping))
+    monkeypatch.setattr(cli, "_get_session", lambda: FakeSession(mapping))
 
     out = cli.save_all_images(["https://ex/pic"], name_prefix="exif", savedir=tmp_path, open_files=False)
 
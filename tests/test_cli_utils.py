@@ -1,16 +1,14 @@
 import io
-import types
+import os
 from pathlib import Path
 from typing import List
 
-import builtins
-import os
 import pytest
 
 from falimage import cli
 
 # Prefixes from environment
-SAFETENSORS_URL = os.getenv("SAFETENSORS_URL")
+SAFETENSORS_URL = os.getenv("SAFETENSORS_URL", "")
 
 
 def test_split_name_and_ext():
@@ -30,9 +28,43 @@ def test_unique_path(tmp_path: Path):
     assert p3.name == "image-2.jpg"
 
 
+def test_unique_path_reserves_and_skips_known_names(tmp_path: Path):
+    fresh = cli._unique_path(tmp_path / "new.jpg")
+    assert fresh == tmp_path / "new.jpg"
+    assert fresh.exists()  # reserved (created) atomically
+
+    for name in ("image.jpg", "image-1.jpg"):
+        (tmp_path / name).write_text("x")
+    # image-2 is only known to be taken, it is skipped without being created
+    p = cli._unique_path(tmp_path / "image.jpg", taken={"image-2.jpg"})
+    assert p.name == "image-3.jpg"
+    assert p.read_bytes() == b""
+    assert not (tmp_path / "image-2.jpg").exists()
+
+
+def test_unique_namer_matches_unique_path(tmp_path: Path):
+    (tmp_path / "image.jpg").write_text("x")
+    (tmp_path / "image-2.jpg").write_text("x")
+    namer = cli._UniqueNamer(tmp_path)
+    assert namer.reserve("image.jpg").name == "image-1.jpg"
+    assert namer.reserve("image.jpg").name == "image-3.jpg"
+    assert namer.reserve("other.png") == tmp_path / "other.png"
+    assert namer.reserve("other.png").name == "other-1.png"
+
+
+def test_unique_namer_skips_files_created_after_listing(tmp_path: Path):
+    namer = cli._UniqueNamer(tmp_path)
+    (tmp_path / "late.jpg").write_text("keep")
+    p = namer.reserve("late.jpg")
+    assert p.name == "late-1.jpg"
+    assert p.exists()
+    assert (tmp_path / "late.jpg").read_text() == "keep"
+
+
 def test_ext_from_content_type():
     assert cli._ext_from_content_type("image/jpeg") == ".jpg"
     assert cli._ext_from_content_type("image/png") == ".png"
+    assert cli._ext_from_content_type("Image/WebP; q=1") == ".webp"
     assert cli._ext_from_content_type("text/html") == ""
     assert cli._ext_from_content_type(None) == ""
     assert cli._ext_from_content_type("image/nonsense; charset=binary") == ""
@@ -72,6 +104,13 @@ def test_parse_loras(inp, expected):
     assert cli.parse_loras(inp) == expected
 
 
+def test_parse_loras_cached_result_not_shared():
+    first = cli.parse_loras("foo:0.8")
+    first[0]["scale"] = 99
+    first.append({"path": "x", "scale": 1.0})
+    assert cli.parse_loras("foo:0.8") == [{"path": f"{SAFETENSORS_URL}foo.safetensors", "scale": 0.8}]
+
+
 @pytest.mark.parametrize(
     "result, expected",
     [
@@ -79,6 +118,7 @@ def test_parse_loras(inp, expected):
         ({"output": ["u3", {"url": "u4"}]}, ["u3", "u4"]),
         ({"image": {"url": "u5"}}, ["u5"]),
         ({"image": ["u6", {"url": "u7"}]}, ["u6", "u7"]),
+        ({"images": [{"url": None}, "u8", {}, 42]}, ["u8"]),
         ({}, []),
     ],
 )
@@ -94,6 +134,10 @@ def test_coerce_image_size_named_and_explicit():
     assert cli.coerce_image_size(None, 640, 480) == {"width": 640, "height": 480}
     with pytest.raises(Exception):
         cli.coerce_image_size("square", 640, 480)
+    with pytest.raises(Exception):
+        cli.coerce_image_size("square_xl", None, None)
+    # Explicit dimensions are never shared between calls
+    assert cli.coerce_image_size(None, 640, 480) is not cli.coerce_image_size(None, 640, 480)
 
 
 def test_build_arguments_seed_randomized(monkeypatch):
@@ -106,24 +150,41 @@ def test_build_arguments_seed_randomized(monkeypatch):
     assert args["num_inference_steps"] == 4  # default merged
 
 
+class FakeRaw(io.BytesIO):
+    """Stands in for resp.raw; checks the download path reads in large chunks."""
+
+    def stream(self, amt, decode_content=None):
+        assert amt >= 65536, f"download chunk size too small: {amt}"
+        while chunk := self.read(amt):
+            yield chunk
+
+
 class FakeResp:
+    __slots__ = ("_content", "headers", "raw", "_iterated", "closed")
+
     def __init__(self, content: bytes, ctype: str = "image/jpeg"):
         self._content = content
         self.headers = {"Content-Type": ctype}
+        self.raw = FakeRaw(content)
         self._iterated = False
+        self.closed = False
 
     def raise_for_status(self):
         return None
 
-    def iter_content(self, chunk_size=8192):
+    def iter_content(self, chunk_size=cli.DOWNLOAD_CHUNK_SIZE, decode_unicode=False):
         # yield in one chunk
         yield self._content
 
     def close(self):
-        pass
+        self.closed = True
 
 
 class FakeSession:
+    # Mapping stays per instance: each test routes its own URLs and a shared
+    # class-level dict would leak responses between tests.
+    __slots__ = ("mapping", "headers")
+
     def __init__(self, mapping):
         self.mapping = mapping
         self.headers = {}
@@ -149,8 +210,8 @@ def test_save_all_images_download_and_naming(monkeypatch, tmp_path: Path):
         "https://ex/not": FakeResp(b"<html>", ctype="text/html"),
     }
 
-    # Monkeypatch requests.Session to return our FakeSession
-    monkeypatch.setattr(cli.requests, "Session", lambda: FakeSession(mapping))
+    # Monkeypatch the pooled session to return our FakeSession
+    monkeypatch.setattr(cli, "_get_session", lambda: FakeSession(mapping))
 
     out: List[Path] = cli.save_all_images(
         ["https://ex/u1.jpg", "https://ex/stream", "https://ex/not"],
@@ -169,3 +230,63 @@ def test_save_all_images_download_and_naming(monkeypatch, tmp_path: Path):
     # Contents
     assert (tmp_path / names[0]).read_bytes() == b"abc"
     assert (tmp_path / names[1]).read_bytes() == b"defghi"
+    # Every response is released, including the skipped one
+    assert all(resp.closed for resp in mapping.values())
+
+
+def test_save_all_images_parallel_keeps_order(monkeypatch, tmp_path: Path):
+    urls = [f"https://ex/img{i}.jpg" for i in range(1, 11)]
+    mapping = {u: FakeResp(u.encode(), ctype="image/jpeg") for u in urls}
+    monkeypatch.setattr(cli, "_get_session", lambda: FakeSession(mapping))
+
+    out = cli.save_all_images(urls, name_prefix="par", savedir=tmp_path, open_files=False)
+
+    assert [p.name for p in out] == [f"par-{i}-img{i}.jpg" for i in range(1, 11)]
+    assert [p.read_bytes() for p in out] == [u.encode() for u in urls]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_save_all_images_leaves_foreign_part_files_alone(monkeypatch, tmp_path: Path):
+    class BrokenRaw(FakeRaw):
+        def stream(self, amt, decode_content=None):
+            raise OSError("connection reset mid-body")
+            yield  # pragma: no cover
+
+    failing = FakeResp(b"", ctype="image/jpeg")
+    failing.raw = BrokenRaw()
+    mapping = {"https://ex/ok.jpg": FakeResp(b"new"), "https://ex/bad.jpg": failing}
+    monkeypatch.setattr(cli, "_get_session", lambda: FakeSession(mapping))
+    for name in ("ok.jpg.part", "bad.jpg.part"):
+        (tmp_path / name).write_bytes(b"someone else's")
+
+    out = cli.save_all_images(list(mapping), savedir=tmp_path, open_files=False)
+
+    assert [p.name for p in out] == ["ok.jpg"]
+    assert out[0].read_bytes() == b"new"
+    # Existing .part files were neither truncated nor removed on failure
+    for name in ("ok.jpg.part", "bad.jpg.part"):
+        assert (tmp_path / name).read_bytes() == b"someone else's"
+    assert not (tmp_path / "bad.jpg").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.jpg.part", "ok.jpg", "ok.jpg.part"]
+
+
+def test_save_all_images_opens_files_once_at_end(monkeypatch, tmp_path: Path):
+    urls = ["https://ex/a.jpg", "https://ex/b.jpg"]
+    mapping = {u: FakeResp(b"x", ctype="image/jpeg") for u in urls}
+    monkeypatch.setattr(cli, "_get_session", lambda: FakeSession(mapping))
+    opened = []
+    monkeypatch.setattr(cli.webbrowser, "open", lambda uri: opened.append(("open", uri)))
+    monkeypatch.setattr(cli.webbrowser, "open_new_tab", lambda uri: opened.append(("tab", uri)))
+
+    out = cli.save_all_images(urls, savedir=tmp_path, open_files=True)
+
+    assert opened == [("open", out[0].resolve().as_uri()), ("tab", out[1].resolve().as_uri())]
+
+
+def test_get_session_is_pooled_and_reused(monkeypatch):
+    monkeypatch.setattr(cli, "_SESSION", None)
+    s1 = cli._get_session()
+    assert cli._get_session() is s1
+    adapter = s1.get_adapter("https://cdn.example/x.jpg")
+    assert adapter._pool_maxsize >= cli.MAX_DOWNLOAD_WORKERS
+    assert s1.headers["Accept-Encoding"] == "identity"
@@ -1,3 +1,5 @@
+import io
+import os
 from pathlib import Path
 from datetime import datetime
 import random
@@ -5,12 +7,24 @@ import random
 import piexif
 from PIL import Image
 
-from falimage.exif import set_exif_data, DEFAULT_CAMERA_MAKE, DEFAULT_CAMERA_MODEL, AUTHOR, SOFTWARE, COPYRIGHT_TEMPLATE
+from falimage.exif import set_exif_data, has_own_exif, DEFAULT_CAMERA_MAKE, DEFAULT_CAMERA_MODEL, AUTHOR, SOFTWARE, COPYRIGHT_TEMPLATE
+
+
+def _build_tiny_jpeg(size=(8, 8), color=(255, 0, 0)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+# Encoded once per session; most tests only need some valid JPEG to tag
+_TINY_JPEG = _build_tiny_jpeg()
 
 
 def _make_temp_jpeg(path: Path, size=(8, 8), color=(255, 0, 0)) -> None:
-    img = Image.new("RGB", size, color)
-    img.save(path, format="JPEG")
+    if size == (8, 8) and color == (255, 0, 0):
+        path.write_bytes(_TINY_JPEG)
+        return
+    path.write_bytes(_build_tiny_jpeg(size, color))
 
 
 def test_set_exif_data_writes_expected_tags(tmp_path: Path):
@@ -27,7 +41,8 @@ def test_set_exif_data_writes_expected_tags(tmp_path: Path):
 
     # Load EXIF and verify fields
     exif = piexif.load(str(p))
-    print(f"{exif=}")
+    if os.environ.get("FALIMAGE_TEST_DEBUG"):
+        print(f"{exif=}")
 
     assert exif["0th"][piexif.ImageIFD.Make] == DEFAULT_CAMERA_MAKE.encode()
     assert exif["0th"][piexif.ImageIFD.Model] == DEFAULT_CAMERA_MODEL.encode()
@@ -53,3 +68,57 @@ def test_set_exif_data_writes_expected_tags(tmp_path: Path):
 def test_set_exif_data_missing_file_returns_false(tmp_path: Path):
     missing = tmp_path / "nope.jpg"
     assert set_exif_data(missing, quiet=True) is False
+
+
+def test_set_exif_data_keeps_jpeg_pixels(tmp_path: Path):
+    p = tmp_path / "test.jpg"
+    _make_temp_jpeg(p)
+    scan_before = p.read_bytes().split(b"\xff\xda", 1)[1]
+
+    assert set_exif_data(p, rng=random.Random(1), file_time=datetime(2024, 1, 2), quiet=True) is True
+
+    # Compressed scan data is untouched: EXIF was spliced in, not re-encoded
+    assert p.read_bytes().split(b"\xff\xda", 1)[1] == scan_before
+    assert piexif.load(str(p))["0th"][piexif.ImageIFD.Software] == SOFTWARE.encode()
+
+
+def test_set_exif_data_png_falls_back_to_pil(tmp_path: Path):
+    p = tmp_path / "test.png"
+    Image.new("RGB", (8, 8), (0, 0, 255)).save(p, format="PNG")
+
+    assert set_exif_data(p, rng=random.Random(1), file_time=datetime(2024, 1, 2), quiet=True) is True
+
+    with Image.open(p) as img:
+        exif = img.getexif()
+    assert exif[piexif.ImageIFD.Software] == SOFTWARE
+
+
+def test_set_exif_data_skips_already_tagged_file(tmp_path: Path):
+    p = tmp_path / "test.jpg"
+    _make_temp_jpeg(p)
+    assert has_own_exif(p) is False
+
+    assert set_exif_data(p, rng=random.Random(1), file_time=datetime(2024, 1, 2), quiet=True) is True
+    assert has_own_exif(p) is True
+    tagged = p.read_bytes()
+
+    # Second run is a no-op even with different inputs
+    assert set_exif_data(p, rng=random.Random(2), file_time=datetime(2025, 6, 7), quiet=True) is True
+    assert p.read_bytes() == tagged
+
+
+def test_precomputed_exif_bytes_match_piexif_dump():
+    from falimage import exif as exif_mod
+
+    for dt in (datetime(2024, 1, 2, 3, 4, 5), datetime(1999, 12, 31, 23, 59, 59), datetime(9999, 1, 1)):
+        for settings in zip(exif_mod.EXPOSURE_TIME_RATIONALS, exif_mod.ISO_VALUES,
+                            exif_mod.FNUMBER_RATIONALS, exif_mod.FOCAL_LENGTH_RATIONALS):
+            expected = piexif.dump(exif_mod._exif_dict(dt, *settings))
+            assert exif_mod._exif_bytes(dt, *settings) == expected
+
+
+def test_set_exif_data_rejects_non_jpeg_bytes(tmp_path: Path):
+    p = tmp_path / "fake.jpg"
+    p.write_bytes(b"abc")
+    assert set_exif_data(p, quiet=True) is False
+    assert p.read_bytes() == b"abc"
@@ -24,7 +24,7 @@ def test_parse_image_urls_mixed():
     # Mixed absolute URLs and names; names get prefix and default extension
     s = "https://example.com/a.jpg,b.png, c"
     urls = cli.parse_image_urls(s)
-    pref = os.getenv("SOURCE_IMAGE_URL")
+    pref = os.getenv("SOURCE_IMAGE_URL", "")
     assert urls == [
         "https://example.com/a.jpg",
         f"{pref}b.png",
@@ -32,6 +32,18 @@ def test_parse_image_urls_mixed():
     ]
 
 
+def test_parse_image_urls_follows_refreshed_prefix(monkeypatch):
+    # The prefix is cached per process; restore the cached values on teardown
+    monkeypatch.setattr(cli, "_SOURCE_IMAGE_URL", cli._SOURCE_IMAGE_URL)
+    monkeypatch.setattr(cli, "_SAFETENSORS_URL", cli._SAFETENSORS_URL)
+    monkeypatch.setenv("SOURCE_IMAGE_URL", "https://src.example/")
+    cli._refresh_env_prefixes()
+    assert cli.parse_image_urls("a,b.png") == [
+        "https://src.example/a.jpg",
+        "https://src.example/b.png",
+    ]
+
+
 def test_build_arguments_seedream_edit(monkeypatch):
     # deterministic seed when 0
     monkeypatch.setattr(cli, "randint", lambda a, b: 424242)
@@ -54,7 +66,7 @@ def test_build_arguments_seedream_edit(monkeypatch):
     # Seed randomized because 0
     assert args["seed"] == 424242
     # image_urls normalized as per rules
-    pref = os.getenv("SOURCE_IMAGE_URL")
+    pref = os.getenv("SOURCE_IMAGE_URL", "")
     assert args["image_urls"] == [
         f"{pref}foo.jpg",
         "https://h/x.png",